@@ -1,18 +1,67 @@
-from flask import Flask, jsonify, render_template, request
-from pymongo import MongoClient
+from flask import Flask, Response, g, jsonify, render_template, request
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+import orjson
+from pymongo import MongoClient, ASCENDING, TEXT
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 from bson import ObjectId
+from bson.errors import InvalidId
 from config import MON_URI, DATABASE_NAME
 import sqlite3
 from datetime import datetime
 import time
 from functools import wraps
 import os
+import threading
+import atexit
+import queue
+import re
+from collections import OrderedDict
+
+
+def orjson_dumps(obj):
+    """Encode obj to JSON bytes with orjson, stringifying types it doesn't know (e.g. ObjectId)."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class OrjsonProvider(JSONProvider):
+    """Route jsonify and request JSON parsing through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson_dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response, skipping a str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson_dumps(obj), mimetype='application/json')
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# Compress JSON responses on the way to the client. Streamed responses
+# (/api/books on a cache miss, /api/reviews) are left uncompressed:
+# Flask-Compress would buffer the whole body to compress it, undoing the
+# streaming.
+app.config['COMPRESS_ALGORITHM'] = ['zstd', 'br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 500
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
 
 # MongoDB Connection
 try:
-    client = MongoClient(MON_URI)
+    client = MongoClient(
+        MON_URI,
+        maxPoolSize=50,
+        minPoolSize=10,
+        serverSelectionTimeoutMS=2000,
+        socketTimeoutMS=5000,
+        retryWrites=True,
+        compressors='zstd,zlib'
+    )
     client.admin.command('ping')
     print("Connected to MongoDB Atlas!")
 except Exception as e:
@@ -22,28 +71,76 @@ db = client[DATABASE_NAME]
 books_collection = db['books']
 reviews_collection = db['reviews']
 users_collection = db['users']
+meta_collection = db['meta']
+
+# Fields returned to the client; everything else stays on the server
+BOOK_PROJECTION = {'title': 1, 'author': 1, 'publication_year': 1, 'image_url': 1}
+REVIEW_PROJECTION = {'book_id': 1, 'user_id': 1, 'user': 1, 'rating': 1, 'comment': 1, 'review_date': 1}
 
 DATABASE = 'db/books.db'
+# Ensure the db directory exists once, before any connection is opened
+os.makedirs(os.path.dirname(DATABASE), exist_ok=True)
+WAL_MAINTENANCE_INTERVAL = 15 * 60  # seconds between WAL checkpoints
+LOG_FLUSH_INTERVAL = 0.05  # seconds to coalesce log rows into one transaction
+CACHE_TTL = 60  # seconds a cached catalog response stays fresh
+CACHE_MAXSIZE = 1024
+
+
+INSERT_LOG_SQL = """
+    INSERT INTO logs (timestamp, function_name, status, execution_time, error_message, details)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def open_db_connection():
+    """Open a connection to the SQLite database for logs."""
+    # Autocommit mode; each statement commits on its own
+    conn = sqlite3.connect(DATABASE, isolation_level=None)
+    conn.row_factory = sqlite3.Row  # This allows dict-like access to rows
+    return conn
 
 
-def get_db_connection():
-    """Create a connection to the SQLite database for logs."""
-    # Ensure the db directory exists
-    os.makedirs('db', exist_ok=True)
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # This allows dict-like access to rows
+def open_long_lived_db_connection():
+    """Open a connection tuned for a background thread that keeps it for its lifetime."""
+    conn = open_db_connection()
+    # Per-connection settings; journal_mode=WAL is persisted by init_logs_table.
+    # Only worth paying for on connections that outlive a single request.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
     return conn
 
 
+def get_db_connection():
+    """Return the SQLite connection for the current request, opening it on first use.
+
+    Only the /api/logs* handlers read or clear logs on the request path, so
+    they get a plain connection that is closed on teardown; log writes go
+    through the long-lived writer connection instead.
+    """
+    if 'db' not in g:
+        g.db = open_db_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def close_db_connection(exception):
+    """Close the request's SQLite connection, if one was opened."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.close()
+
+
 def init_logs_table():
     """Initialize the SQLite database with the logs table."""
     try:
-        conn = get_db_connection()
+        conn = open_db_connection()
+        # WAL lets /api/logs readers run alongside log writes and is stored in the db file
+        conn.execute("PRAGMA journal_mode=WAL")
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS logs (
                 log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME NOT NULL,
+                timestamp DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
                 function_name TEXT NOT NULL,
                 status TEXT NOT NULL,
                 execution_time REAL,
@@ -51,7 +148,15 @@ def init_logs_table():
                 details TEXT
             )
         """)
-        conn.commit()
+        # Covers the GROUP BY in get_log_stats, including the error count
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_logs_fn_time
+            ON logs(function_name, execution_time, status)
+            WHERE execution_time IS NOT NULL
+        """)
+        # Serve the ORDER BY timestamp DESC LIMIT queries in get_logs
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_status_ts ON logs(status, timestamp DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(timestamp DESC)")
         cursor.close()
         conn.close()
         print("SQLite logs table initialized successfully")
@@ -59,33 +164,133 @@ def init_logs_table():
         print(f"Error initializing SQLite logs table: {e}")
 
 
+def wal_maintenance():
+    """Periodically checkpoint the WAL and refresh query planner statistics."""
+    conn = open_long_lived_db_connection()
+    while True:
+        time.sleep(WAL_MAINTENANCE_INTERVAL)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            print(f"Error during SQLite WAL maintenance: {e}")
+
+
+def start_wal_maintenance():
+    """Run WAL maintenance in a daemon thread so request threads never checkpoint."""
+    thread = threading.Thread(target=wal_maintenance, name='wal-maintenance', daemon=True)
+    thread.start()
+
+
+_log_queue = queue.Queue()
+
+
 def log_to_db(function_name, status, execution_time=None, error_message=None, details=None):
-    """Insert a log entry into the SQLite logs table."""
+    """Queue a log entry for the background writer to insert into the SQLite logs table."""
+    # Only the raw epoch time is taken here; write_log_batch formats it off the request path
+    values = (
+        time.time(),
+        function_name,
+        status,
+        execution_time,
+        error_message,
+        details
+    )
+    _log_queue.put(values)
+
+
+def drain_log_queue(batch):
+    """Move every log entry currently waiting in the queue into batch."""
+    while True:
+        try:
+            batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            return batch
+
+
+def write_log_batch(conn, batch):
+    """Insert a batch of log entries in a single transaction."""
+    rows = [
+        (datetime.fromtimestamp(logged_at).isoformat(sep=' ', timespec='seconds'), *values)
+        for logged_at, *values in batch
+    ]
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        query = """
-            INSERT INTO logs (timestamp, function_name, status, execution_time, error_message, details)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """
-        values = (
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            function_name,
-            status,
-            execution_time,
-            error_message,
-            details
-        )
-        cursor.execute(query, values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        conn.execute("BEGIN")
+        conn.executemany(INSERT_LOG_SQL, rows)
+        conn.execute("COMMIT")
     except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
         print(f"Failed to log to database: {e}")
 
 
+def log_writer():
+    """Drain the log queue, committing everything that arrives within LOG_FLUSH_INTERVAL together."""
+    # The writer's connection lives as long as this thread
+    conn = open_long_lived_db_connection()
+    while True:
+        batch = drain_log_queue([_log_queue.get()])
+        stopping = _LOG_WRITER_STOP in batch
+        if not stopping:
+            time.sleep(LOG_FLUSH_INTERVAL)
+            drain_log_queue(batch)
+            stopping = _LOG_WRITER_STOP in batch
+        entries = [entry for entry in batch if entry is not _LOG_WRITER_STOP]
+        if entries:
+            write_log_batch(conn, entries)
+        if stopping:
+            conn.close()
+            return
+
+
+_LOG_WRITER_STOP = object()
+_log_writer = threading.Thread(target=log_writer, name='log-writer', daemon=True)
+_log_writer.start()
+
+
+@atexit.register
+def stop_log_writer():
+    """Stop the writer on interpreter shutdown once it has written every queued entry."""
+    _log_queue.put(_LOG_WRITER_STOP)
+    _log_writer.join()
+
+
+def log_success(function_name, t1):
+    """Log a successful call that started at t1."""
+    delta_t = time.time() - t1
+    log_to_db(
+        function_name=function_name,
+        status='success',
+        execution_time=delta_t,
+        details=f'Executed successfully in {delta_t:.4f} seconds'
+    )
+
+
+def log_error(function_name, e):
+    """Log a failed call without execution time."""
+    log_to_db(
+        function_name=function_name,
+        status='error',
+        error_message=str(e),
+        details=f'Function failed with exception: {str(e)}'
+    )
+
+
+def timed_stream(function_name, t1, chunks):
+    """Pass a streamed body through, logging the call once the body is sent or fails."""
+    try:
+        yield from chunks
+    except Exception as e:
+        log_error(function_name, e)
+        raise
+    log_success(function_name, t1)
+
+
 def timeit(func):
-    """Decorator to log function execution time to SQLite."""
+    """Decorator to log function execution time to SQLite.
+
+    Streamed responses are timed until their last chunk is sent.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
         function_name = func.__name__
@@ -93,57 +298,225 @@ def timeit(func):
         
         try:
             result = func(*args, **kwargs)
-            t2 = time.time()
-            delta_t = t2 - t1
-            
-            # Log successful execution
-            log_to_db(
-                function_name=function_name,
-                status='success',
-                execution_time=delta_t,
-                details=f'Executed successfully in {delta_t:.4f} seconds'
-            )
-            
-            return result
-            
         except Exception as e:
-            # Log error without execution time
-            log_to_db(
-                function_name=function_name,
-                status='error',
-                error_message=str(e),
-                details=f'Function failed with exception: {str(e)}'
-            )
+            log_error(function_name, e)
             raise  # Re-raise the exception
+
+        if isinstance(result, Response) and result.is_streamed:
+            result.response = timed_stream(function_name, t1, result.response)
+        else:
+            log_success(function_name, t1)
+        return result
     
     return wrapper
 
 
-def serialize_book(book):
-    """Convert MongoDB book document to JSON-serializable format."""
-    if book and '_id' in book:
-        book['book_id'] = str(book['_id'])
-        del book['_id']
-    return book
+def parse_object_id(value):
+    """Parse a hex string into an ObjectId, returning None if it isn't valid."""
+    # ObjectId(None) would generate a fresh id instead of failing
+    if not isinstance(value, str):
+        return None
+    try:
+        return ObjectId(value)
+    except InvalidId:
+        return None
+
+
+def build_serializer(name, id_field, object_id_fields=(), doc=None):
+    """Generate a serializer specialized for a fixed document schema.
+
+    The generated function renames _id to id_field and stringifies the
+    listed ObjectId fields with no per-call generic checks.
+    """
+    lines = [
+        f"def {name}(document):",
+        f"    document[{id_field!r}] = str(document.pop('_id'))",
+    ]
+    for field in object_id_fields:
+        lines += [
+            f"    value = document.get({field!r})",
+            "    if value.__class__ is ObjectId:",
+            f"        document[{field!r}] = str(value)",
+        ]
+    lines.append("    return document")
+    namespace = {'ObjectId': ObjectId}
+    exec("\n".join(lines), namespace)
+    serializer = namespace[name]
+    serializer.__doc__ = doc
+    return serializer
+
+
+serialize_book = build_serializer(
+    'serialize_book', 'book_id',
+    doc="Convert MongoDB book document to JSON-serializable format."
+)
+serialize_review = build_serializer(
+    'serialize_review', 'review_id', ('book_id', 'user_id'),
+    doc="Convert MongoDB review document to JSON-serializable format."
+)
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of serialized JSON response bodies.
+
+    generation increases on every invalidation. A caller that reads the
+    database before set() passes the generation it started with, so a body
+    built from data invalidated in the meantime is never stored.
+    """
+
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (body, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def catalog_version():
+    """Return the catalog version shared by all workers through MongoDB.
+
+    Each worker process has its own response_cache, so catalog entries are
+    keyed on this version: a write handled by any worker bumps it, and every
+    other worker stops serving its older entries on the next read instead
+    of up to CACHE_TTL later.
+    """
+    doc = meta_collection.find_one({'_id': 'catalog'}, {'version': 1})
+    return doc['version'] if doc else 0
+
+
+def invalidate_catalog():
+    """Bump the shared catalog version and drop this worker's cached entries."""
+    meta_collection.update_one({'_id': 'catalog'}, {'$inc': {'version': 1}}, upsert=True)
+    response_cache.clear()
+
+
+def json_response(body, status=200):
+    """Wrap an already serialized JSON body in a response."""
+    return Response(body, status=status, mimetype='application/json')
+
+
+def stream_json_array(cursor, wrap_key, serialize):
+    """Stream a cursor as {"<wrap_key>": [...]} without materializing the result list.
+
+    The first document is fetched before returning, so a failing query
+    raises in the view (and becomes a 500) instead of truncating a 200.
+    """
+    cursor = iter(cursor)
+    first = next(cursor, None)
+
+    def generate():
+        yield b'{"' + wrap_key + b'":['
+        if first is not None:
+            yield orjson_dumps(serialize(first))
+            for document in cursor:
+                yield b',' + orjson_dumps(serialize(document))
+        yield b']}'
+
+    return generate()
+
+
+def cache_stream(key, chunks, generation):
+    """Pass chunks through, caching the joined body under key once fully sent.
+
+    generation must be read before the query that produces chunks runs.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    response_cache.set(key, b''.join(parts), generation)
+
+
+# (collection, keys, options) for every index the API queries rely on
+MONGO_INDEXES = [
+    # Backs the $text query in search_books
+    (books_collection, [('title', TEXT), ('author', TEXT)], {'name': 'book_text_idx'}),
+    # Backs the anchored prefix fallback and .sort('title', 1) in search_books
+    (books_collection, [('title', ASCENDING)], {}),
+    # Lets distinct('author') in get_all_authors use a DISTINCT_SCAN
+    (books_collection, [('author', ASCENDING)], {}),
+    # Backs the per-book lookup in get_reviews_by_book
+    (reviews_collection, [('book_id', ASCENDING)], {}),
+    # Makes seeding the sample books idempotent
+    (books_collection, [('title', ASCENDING), ('author', ASCENDING)], {'unique': True}),
+]
+
+
+def create_indexes():
+    """Create the MongoDB indexes used by the API queries.
+
+    Each index is created on its own, so one failure (e.g. existing
+    duplicates blocking the unique index) doesn't skip the rest.
+    """
+    for collection, keys, options in MONGO_INDEXES:
+        try:
+            collection.create_index(keys, **options)
+        except PyMongoError as e:
+            print(f"Error creating MongoDB index {keys} on {collection.name}: {e}")
+
+
+_authors = set()
+_authors_lock = threading.Lock()
+_authors_expires = 0.0  # monotonic time after which _authors is reloaded
 
 
-def serialize_review(review):
-    """Convert MongoDB review document to JSON-serializable format."""
-    if review and '_id' in review:
-        review['review_id'] = str(review['_id'])
-        del review['_id']
-        if 'book_id' in review and isinstance(review['book_id'], ObjectId):
-            review['book_id'] = str(review['book_id'])
-        if 'user_id' in review and isinstance(review['user_id'], ObjectId):
-            review['user_id'] = str(review['user_id'])
-    return review
+def load_authors():
+    """Populate the in-memory author set from MongoDB."""
+    global _authors_expires
+    authors = books_collection.distinct("author")
+    with _authors_lock:
+        _authors.clear()
+        _authors.update(authors)
+        _authors_expires = time.monotonic() + CACHE_TTL
+
+
+def current_authors():
+    """Return the sorted authors, reloading them when unset or older than CACHE_TTL.
 
+    Each worker process keeps its own set, so the TTL bounds how long one
+    worker misses books added or deleted through another.
+    """
+    if time.monotonic() >= _authors_expires:
+        load_authors()
+    with _authors_lock:
+        return sorted(_authors)
 
 
 def init_mongodb():
-    """Initialize MongoDB with sample data if empty."""
+    """Initialize MongoDB indexes, and sample data if empty."""
     try:
-        count = books_collection.count_documents({})
+        create_indexes()
+        # Reads collection metadata instead of counting every document
+        count = books_collection.estimated_document_count()
         if count == 0:
             print("Initializing sample books data in MongoDB...")
             sample_books = [
@@ -220,8 +593,17 @@ def init_mongodb():
                     "image_url": "https://m.media-amazon.com/images/I/51S8VRFN0CL._SX430_BO1,204,203,200_.jpg"
                 }
             ]
-            result = books_collection.insert_many(sample_books)
-            print(f"Inserted {len(result.inserted_ids)} sample books into MongoDB")
+            try:
+                result = books_collection.insert_many(sample_books, ordered=False)
+                inserted = len(result.inserted_ids)
+            except BulkWriteError as e:
+                # Another worker may have seeded the same books concurrently
+                write_errors = e.details['writeErrors']
+                if any(error['code'] != 11000 for error in write_errors):
+                    raise
+                inserted = e.details['nInserted']
+            print(f"Inserted {inserted} sample books into MongoDB")
+            invalidate_catalog()
         else:
             print(f"MongoDB already initialized with {count} books")
     except Exception as e:
@@ -233,15 +615,21 @@ def init_mongodb():
 @app.route('/api/books', methods=['GET'])
 @timeit
 def get_all_books():
-    books = list(books_collection.find())
-    book_list = [serialize_book(book.copy()) for book in books]
-    return jsonify({'books': book_list})
+    cache_key = ('books', catalog_version())
+    body = response_cache.get(cache_key)
+    if body is not None:
+        return json_response(body)
+
+    generation = response_cache.generation
+    books = books_collection.find({}, BOOK_PROJECTION).batch_size(500)
+    chunks = stream_json_array(books, b'books', serialize_book)
+    return json_response(cache_stream(cache_key, chunks, generation))
 
 
 @app.route('/api/authors', methods=['GET'])
 @timeit
 def get_all_authors():
-    authors = books_collection.distinct("author")
+    authors = current_authors()
     author_list = [{'name': author} for author in authors]
     return jsonify({'authors': author_list})
 
@@ -265,8 +653,14 @@ def add_book():
         'image_url': image_url
     }
 
-    result = books_collection.insert_one(book_document)
+    try:
+        result = books_collection.insert_one(book_document)
+    except DuplicateKeyError:
+        return jsonify({'error': 'A book with this title and author already exists'}), 409
     book_id = str(result.inserted_id)
+    invalidate_catalog()
+    with _authors_lock:
+        _authors.add(author)
 
     return jsonify({
         'message': 'Book added successfully',
@@ -282,14 +676,24 @@ def search_books():
     if not query:
         return jsonify({'error': 'No search query provided'}), 400
     
-    search_filter = {
-        '$or': [
-            {'title': {'$regex': query, '$options': 'i'}},
-            {'author': {'$regex': query, '$options': 'i'}}
-        ]
-    }
-    results = list(books_collection.find(search_filter).sort('title', 1))
-    books = [serialize_book(book.copy()) for book in results]
+    # Whole-word matches come from the text index, best matches first.
+    # Each term is quoted so $text requires all of them instead of any.
+    terms = [term.replace('"', '') for term in query.split()]
+    text_search = ' '.join(f'"{term}"' for term in terms if term)
+    results = list(
+        books_collection.find(
+            {'$text': {'$search': text_search}},
+            {**BOOK_PROJECTION, 'score': {'$meta': 'textScore'}}
+        ).sort([('score', {'$meta': 'textScore'})])
+    ) if text_search else []
+    for book in results:
+        book.pop('score')
+    if not results:
+        # Partial words are matched as an anchored prefix so the title index can be used
+        prefix = re.compile('^' + re.escape(query), re.IGNORECASE)
+        search_filter = {'$or': [{'title': prefix}, {'author': prefix}]}
+        results = list(books_collection.find(search_filter, BOOK_PROJECTION).sort('title', 1))
+    books = [serialize_book(book) for book in results]
     
     return jsonify({'results': books, 'count': len(books)})
 
@@ -297,29 +701,80 @@ def search_books():
 @app.route('/api/book/<book_id>', methods=['GET'])
 @timeit
 def get_book(book_id):
-    if not ObjectId.is_valid(book_id):
+    oid = parse_object_id(book_id)
+    if oid is None:
         return jsonify({'error': 'Invalid book ID format'}), 400
     
-    book = books_collection.find_one({'_id': ObjectId(book_id)})
+    cache_key = ('book', str(oid), catalog_version())
+    body = response_cache.get(cache_key)
+    if body is not None:
+        return json_response(body)
+
+    generation = response_cache.generation
+    book = books_collection.find_one({'_id': oid}, BOOK_PROJECTION)
 
     if not book:
         return jsonify({'error': 'Book not found'}), 404
     
-    book_dict = serialize_book(book.copy())
+    book_dict = serialize_book(book)
+    body = jsonify({'book': book_dict}).get_data()
+    response_cache.set(cache_key, body, generation)
+    return json_response(body)
+
+
+@app.route('/api/book/<book_id>/full', methods=['GET'])
+@timeit
+def get_book_with_reviews(book_id):
+    oid = parse_object_id(book_id)
+    if oid is None:
+        return jsonify({'error': 'Invalid book ID format'}), 400
+
+    # Join the book's reviews server-side in one round-trip. Older reviews
+    # stored book_id as a string, so match both forms; an array localField
+    # still lets $lookup use the reviews.book_id index.
+    pipeline = [
+        {'$match': {'_id': oid}},
+        {'$addFields': {'review_book_ids': ['$_id', {'$toString': '$_id'}]}},
+        {'$lookup': {
+            'from': 'reviews',
+            'localField': 'review_book_ids',
+            'foreignField': 'book_id',
+            'as': 'reviews'
+        }},
+        {'$project': {
+            **BOOK_PROJECTION,
+            'reviews.user': 1,
+            'reviews.rating': 1,
+            'reviews.comment': 1,
+            'reviews.review_date': 1
+        }}
+    ]
+    book = next(books_collection.aggregate(pipeline), None)
+
+    if not book:
+        return jsonify({'error': 'Book not found'}), 404
+
+    book_dict = serialize_book(book)
     return jsonify({'book': book_dict})
 
 
 @app.route('/api/book/<book_id>', methods=['DELETE'])
 @timeit
 def delete_book(book_id):
-    if not ObjectId.is_valid(book_id):
+    oid = parse_object_id(book_id)
+    if oid is None:
         return jsonify({'error': 'Invalid book ID format'}), 400
     
-    result = books_collection.delete_one({'_id': ObjectId(book_id)})
+    book = books_collection.find_one_and_delete({'_id': oid}, {'author': 1})
 
-    if result.deleted_count == 0:
+    if not book:
         return jsonify({'error': 'Book not found'}), 404
 
+    invalidate_catalog()
+    author = book.get('author')
+    with _authors_lock:
+        if books_collection.count_documents({'author': author}, limit=1) == 0:
+            _authors.discard(author)
     return jsonify({'message': 'Book deleted successfully'})
 
 
@@ -329,9 +784,8 @@ def delete_book(book_id):
 @timeit
 def get_all_reviews():
     # Get all reviews from MongoDB.
-    reviews = list(reviews_collection.find())
-    review_list = [serialize_review(review.copy()) for review in reviews]
-    return jsonify({'reviews': review_list})
+    reviews = reviews_collection.find({}, REVIEW_PROJECTION).batch_size(500)
+    return json_response(stream_json_array(reviews, b'reviews', serialize_review))
 @app.route('/api/add_review', methods=['POST'])
 @timeit
 def add_review():
@@ -342,8 +796,13 @@ def add_review():
     rating = data.get('rating')
     comment = data.get('review_text')
 
+    oid = parse_object_id(book_id)
+    if oid is None:
+        return jsonify({'error': 'Invalid book ID format'}), 400
+
     review = {
-        'book_id': book_id,
+        # Stored as an ObjectId so it matches books._id in $lookup
+        'book_id': oid,
         'user': user,
         'rating': rating,
         'comment': comment,
@@ -359,8 +818,11 @@ def add_review():
 @timeit
 def get_reviews_by_book(book_id):
     # Get all reviews for a specific book
-    reviews = list(reviews_collection.find({'book_id': book_id}))
-    review_list = [serialize_review(review.copy()) for review in reviews]
+    # Older reviews stored book_id as a string, newer ones as an ObjectId
+    oid = parse_object_id(book_id)
+    book_ids = [book_id] if oid is None else [book_id, oid]
+    reviews = reviews_collection.find({'book_id': {'$in': book_ids}}, REVIEW_PROJECTION)
+    review_list = [serialize_review(review) for review in reviews]
     return jsonify({'reviews': review_list, 'count': len(review_list)})
 
 # ==================== LOGS ENDPOINTS ====================
@@ -389,7 +851,6 @@ def get_logs():
         
         logs = [dict(row) for row in cursor.fetchall()]
         cursor.close()
-        conn.close()
         
         return jsonify({'logs': logs, 'count': len(logs)})
     except sqlite3.Error as e:
@@ -420,7 +881,6 @@ def get_log_stats():
         
         stats = [dict(row) for row in cursor.fetchall()]
         cursor.close()
-        conn.close()
         
         return jsonify({'stats': stats})
     except sqlite3.Error as e:
@@ -435,9 +895,7 @@ def clear_logs():
         cursor = conn.cursor()
         cursor.execute("DELETE FROM logs")
         deleted_count = cursor.rowcount
-        conn.commit()
         cursor.close()
-        conn.close()
         
         return jsonify({'message': f'Cleared {deleted_count} log entries'})
     except sqlite3.Error as e:
@@ -451,14 +909,23 @@ def index():
     return render_template('index.html', current_year=2025)
 
 
-if __name__ == '__main__':
-    # Initialize databases
+def init_app():
+    """Initialize databases and background maintenance for this process."""
     init_logs_table()
+    start_wal_maintenance()
     init_mongodb()
+
+
+if __name__ == '__main__':
+    # Production runs under gunicorn (see gunicorn.conf.py); this is the
+    # cross-platform fallback for local runs, including Windows
+    from waitress import serve
+
+    init_app()
     
     print("\n" + "="*50)
     print("Application started successfully!")
     print("SQLite logging enabled for all functions")
     print("="*50 + "\n")
     
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    serve(app, host="0.0.0.0", port=5000, threads=16)
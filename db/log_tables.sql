@@ -1,7 +1,7 @@
 -- SQLite schema for logs table
 CREATE TABLE IF NOT EXISTS logs (
     log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    timestamp DATETIME NOT NULL,
+    timestamp DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
     function_name TEXT NOT NULL,
     status TEXT NOT NULL,
     execution_time REAL,
@@ -9,6 +9,13 @@ CREATE TABLE IF NOT EXISTS logs (
     details TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_logs_fn_time
+ON logs(function_name, execution_time, status)
+WHERE execution_time IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_logs_status_ts ON logs(status, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(timestamp DESC);
+
 -- Example queries to view logs
 -- Get all logs
 SELECT * FROM logs ORDER BY timestamp DESC;
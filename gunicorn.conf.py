@@ -0,0 +1,19 @@
+import multiprocessing
+import os
+
+# Every route waits on MongoDB or SQLite, so give each worker a pool of
+# real OS threads to overlap that I/O. gevent workers are avoided on purpose:
+# they would turn the log writer and WAL maintenance threads into greenlets
+# whose blocking SQLite calls stall every request in the worker.
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = 2 * multiprocessing.cpu_count() + 1
+worker_class = 'gthread'
+threads = 16
+worker_connections = 1000
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # Each worker keeps its own caches and background threads
+    from app import init_app
+    init_app()
@@ -3,7 +3,11 @@ import json
 import os
 import sys
 import sqlite3
-from app import app, init_db, DATABASE
+
+# Run against a separate MongoDB database so tests can reset it freely
+os.environ.setdefault('DATABASE_NAME', 'bookshelf_test_db')
+
+from app import app, init_logs_table, init_mongodb, DATABASE
 
 class BookshelfIntegrationTests(unittest.TestCase):
     """Integration tests for the Bookshelf application"""
@@ -29,7 +33,14 @@ class BookshelfIntegrationTests(unittest.TestCase):
         app_module.DATABASE = self.test_db
         
         # Initialize test database
-        init_db()
+        init_logs_table()
+        
+        # Reset MongoDB to the sample data and drop anything cached from it
+        for name in ('books', 'reviews', 'meta'):
+            app_module.db.drop_collection(name)
+        app_module.response_cache.clear()
+        app_module._authors_expires = 0.0
+        init_mongodb()
         
     def tearDown(self):
         """Clean up after each test"""
@@ -163,6 +174,22 @@ class BookshelfIntegrationTests(unittest.TestCase):
         
         self.assertEqual(final_count, initial_count + 3)
     
+    def test_add_duplicate_book_returns_409(self):
+        """Test adding a book with an existing title and author returns conflict"""
+        duplicate = {
+            'title': 'Clean Code',
+            'author': 'Robert C. Martin',
+            'publication_year': 2008
+        }
+        
+        response = self.app.post('/api/add_book',
+                                data=json.dumps(duplicate),
+                                content_type='application/json')
+        
+        self.assertEqual(response.status_code, 409)
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+    
     # ==================== SEARCH TESTS ====================
     
     def test_search_by_title_exact_match(self):
@@ -272,6 +299,19 @@ class BookshelfIntegrationTests(unittest.TestCase):
             self.assertIn('publication_year', book)
             self.assertIn('image_url', book)
     
+    def test_search_requires_all_terms(self):
+        """Test that multi-word searches only match books containing every term"""
+        response = self.app.get('/api/search?q=Clean Code')
+        data = json.loads(response.data)
+        
+        titles = [book['title'] for book in data['results']]
+        self.assertIn('Clean Code', titles)
+        self.assertNotIn('Code Complete', titles)
+        
+        # The text score is only used for ordering
+        for book in data['results']:
+            self.assertNotIn('score', book)
+    
     # ==================== GET SPECIFIC BOOK TEST ====================
     
     def test_get_specific_book_by_id(self):
@@ -299,6 +339,49 @@ class BookshelfIntegrationTests(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
+    # ==================== CACHE INVALIDATION TESTS ====================
+    
+    def test_books_cache_invalidated_on_add(self):
+        """Test that a cached book list reflects a newly added book"""
+        self.app.get('/api/books')  # warm the cache
+        
+        new_book = {'title': 'Cache Test Book', 'author': 'Cache Author'}
+        response = self.app.post('/api/add_book',
+                                data=json.dumps(new_book),
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        
+        books = json.loads(self.app.get('/api/books').data)['books']
+        self.assertIn('Cache Test Book', [b['title'] for b in books])
+    
+    def test_book_cache_invalidated_on_delete(self):
+        """Test that a cached book is no longer served after it is deleted"""
+        books = json.loads(self.app.get('/api/books').data)['books']
+        book_id = books[0]['book_id']
+        self.assertEqual(self.app.get(f'/api/book/{book_id}').status_code, 200)
+        
+        # Delete using upper-case hex; the cache key must still match
+        response = self.app.delete(f'/api/book/{book_id.upper()}')
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(self.app.get(f'/api/book/{book_id}').status_code, 404)
+    
+    def test_books_cache_sees_writes_from_other_workers(self):
+        """Test that a write made by another worker process invalidates this one's cache"""
+        import app as app_module
+        
+        self.app.get('/api/books')  # warm the cache
+        
+        # Another worker inserts and bumps the shared version, without
+        # touching this process's response cache
+        app_module.books_collection.insert_one({'title': 'Other Worker Book', 'author': 'Someone'})
+        app_module.meta_collection.update_one(
+            {'_id': 'catalog'}, {'$inc': {'version': 1}}, upsert=True
+        )
+        
+        books = json.loads(self.app.get('/api/books').data)['books']
+        self.assertIn('Other Worker Book', [b['title'] for b in books])
+    
     # ==================== AUTHORS TEST ====================
     
     def test_get_all_authors(self):
@@ -311,6 +394,76 @@ class BookshelfIntegrationTests(unittest.TestCase):
         self.assertIsInstance(data['authors'], list)
         self.assertGreater(len(data['authors']), 0)
     
+    # ==================== REVIEWS TESTS ====================
+    
+    def test_add_review_invalid_book_id(self):
+        """Test adding a review with an invalid book ID returns error"""
+        review = {
+            'book_id': 'not-a-valid-id',
+            'user_name': 'Tester',
+            'rating': 5,
+            'review_text': 'Great book'
+        }
+        
+        response = self.app.post('/api/add_review',
+                                 data=json.dumps(review),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+    
+    def test_get_book_with_reviews(self):
+        """Test retrieving a book together with its new and legacy reviews"""
+        import app as app_module
+        
+        response = self.app.get('/api/books')
+        book_id = json.loads(response.data)['books'][0]['book_id']
+        
+        # New reviews store book_id as an ObjectId
+        review = {
+            'book_id': book_id,
+            'user_name': 'Tester',
+            'rating': 4,
+            'review_text': 'Full endpoint review'
+        }
+        add_response = self.app.post('/api/add_review',
+                                     data=json.dumps(review),
+                                     content_type='application/json')
+        self.assertEqual(add_response.status_code, 200)
+        review_id = json.loads(add_response.data)['review_id']
+        
+        # Reviews written before the change stored book_id as a string
+        legacy = app_module.reviews_collection.insert_one({
+            'book_id': book_id,
+            'user': 'Legacy Tester',
+            'rating': 3,
+            'comment': 'Legacy review'
+        })
+        
+        try:
+            response = self.app.get(f'/api/book/{book_id}/full')
+            self.assertEqual(response.status_code, 200)
+            
+            data = json.loads(response.data)
+            self.assertEqual(data['book']['book_id'], book_id)
+            comments = [r['comment'] for r in data['book']['reviews']]
+            self.assertIn('Full endpoint review', comments)
+            self.assertIn('Legacy review', comments)
+            self.assertNotIn('review_book_ids', data['book'])
+        finally:
+            app_module.reviews_collection.delete_many({
+                '_id': {'$in': [app_module.ObjectId(review_id), legacy.inserted_id]}
+            })
+    
+    def test_get_book_with_reviews_invalid_id(self):
+        """Test getting a book with reviews using an invalid ID returns error"""
+        response = self.app.get('/api/book/99999/full')
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+    
     # ==================== INTEGRATION WORKFLOW TEST ====================
     
     def test_complete_workflow(self):